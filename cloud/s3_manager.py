@@ -4,12 +4,45 @@ S3 integration module for cloud-based result storage.
 Provides simple S3 upload and management capabilities.
 """
 
+import atexit
 import os
-import json
-import subprocess
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import boto3
+import orjson
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+# 64 MiB multipart chunks keep per-part request overhead small while still
+# parallelizing large files; one config shared by all uploads.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=64 * 1024 * 1024,
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True
+)
+
+# Anything past one multipart chunk gets wider concurrency and larger
+# read buffers so a single big artifact can saturate the uplink.
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+
+LARGE_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=LARGE_FILE_THRESHOLD,
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=min(32, (os.cpu_count() or 4) * 4),
+    io_chunksize=8 * 1024 * 1024,
+    use_threads=True
+)
+
+UPLOAD_WORKERS = 16
+
+# How long cached credential/bucket checks stay valid (seconds).
+CHECK_CACHE_TTL = 300
+
 class S3Manager:
     """Simple S3 integration for workflow result storage."""
 
@@ -22,30 +55,68 @@ class S3Manager:
             username = os.getenv('USER', 'workflow')
             self.bucket_name = f"ai-devops-results-{username}"
 
-    def run_aws_command(self, command):
-        """Execute AWS CLI command and return result."""
-        try:
-            result = subprocess.run(
-                ['aws'] + command,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return True, result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            return False, e.stderr.strip()
-        except FileNotFoundError:
-            return False, "AWS CLI not installed"
+        # One client per process: reuses the HTTP connection pool across
+        # calls instead of paying CLI startup + TLS handshake per operation.
+        # boto3 clients are thread-safe and meant to be shared; the Session
+        # that creates them is not, so only the clients leave this scope.
+        client_config = Config(
+            max_pool_connections=50,
+            retries={'max_attempts': 3},
+            tcp_keepalive=True,
+            s3={'addressing_style': 'virtual'}
+        )
+        session = boto3.Session(region_name=self.region)
+        self._s3 = session.client('s3', config=client_config)
+        self._sts = session.client('sts', config=client_config)
+
+        # Memoized connectivity checks: credentials and bucket existence
+        # rarely change mid-run, so repeated callers (health checks,
+        # create_bucket_if_needed) skip the network roundtrip for the TTL.
+        self._aws_ok_cache = None
+        self._aws_ok_expiry = 0
+        self._bucket_cache = None
+        self._bucket_expiry = 0
+
+        # One bounded pool shared by every fan-out (directory sync, copies,
+        # log shipping); sized to the connection pool so thread and FD
+        # counts stay fixed no matter how many files a caller submits.
+        self._executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS,
+                                            thread_name_prefix='s3')
+        atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Drain and stop the shared upload executor."""
+        self._executor.shutdown(wait=True)
 
     def check_aws_configured(self):
-        """Check if AWS credentials are configured."""
-        success, output = self.run_aws_command(['sts', 'get-caller-identity'])
-        return success
+        """Check if AWS credentials are configured (cached for a few minutes)."""
+        if time.monotonic() < self._aws_ok_expiry:
+            return self._aws_ok_cache
+
+        try:
+            self._sts.get_caller_identity()
+            result = True
+        except (BotoCoreError, ClientError):
+            result = False
+
+        self._aws_ok_cache = result
+        self._aws_ok_expiry = time.monotonic() + CHECK_CACHE_TTL
+        return result
 
     def check_bucket_exists(self):
-        """Check if the S3 bucket exists."""
-        success, output = self.run_aws_command(['s3', 'ls', f's3://{self.bucket_name}'])
-        return success
+        """Check if the S3 bucket exists (cached for a few minutes)."""
+        if time.monotonic() < self._bucket_expiry:
+            return self._bucket_cache
+
+        try:
+            self._s3.head_bucket(Bucket=self.bucket_name)
+            result = True
+        except (BotoCoreError, ClientError):
+            result = False
+
+        self._bucket_cache = result
+        self._bucket_expiry = time.monotonic() + CHECK_CACHE_TTL
+        return result
 
     def create_bucket_if_needed(self):
         """Create S3 bucket if it doesn't exist."""
@@ -58,17 +129,23 @@ class S3Manager:
             return True
 
         print(f"Creating bucket {self.bucket_name}")
-        success, output = self.run_aws_command([
-            's3', 'mb', f's3://{self.bucket_name}',
-            '--region', self.region
-        ])
+        try:
+            create_args = {'Bucket': self.bucket_name}
+            if self.region != 'us-east-1':
+                create_args['CreateBucketConfiguration'] = {
+                    'LocationConstraint': self.region
+                }
+            self._s3.create_bucket(**create_args)
+        except (BotoCoreError, ClientError) as e:
+            print(f"Failed to create bucket: {e}")
+            return False
 
-        if success:
-            print(f"Successfully created bucket {self.bucket_name}")
-        else:
-            print(f"Failed to create bucket: {output}")
+        # Refresh the cached existence check so a stale miss isn't served.
+        self._bucket_cache = True
+        self._bucket_expiry = time.monotonic() + CHECK_CACHE_TTL
 
-        return success
+        print(f"Successfully created bucket {self.bucket_name}")
+        return True
 
     def upload_file(self, local_path, s3_key):
         """Upload a single file to S3."""
@@ -80,19 +157,58 @@ class S3Manager:
 
         print(f"Uploading {local_path} to s3://{self.bucket_name}/{s3_key}")
 
-        success, output = self.run_aws_command([
-            's3', 'cp', str(local_path), f's3://{self.bucket_name}/{s3_key}'
-        ])
+        config = TRANSFER_CONFIG
+        if local_path.stat().st_size > LARGE_FILE_THRESHOLD:
+            config = LARGE_TRANSFER_CONFIG
 
-        if success:
-            print(f"Upload successful: {s3_key}")
-        else:
-            print(f"Upload failed: {output}")
+        try:
+            with open(local_path, 'rb') as f:
+                self.upload_stream(f, s3_key, config=config)
+        except (BotoCoreError, ClientError) as e:
+            print(f"Upload failed: {e}")
+            return False
 
-        return success
+        print(f"Upload successful: {s3_key}")
+        return True
+
+    def upload_stream(self, fileobj, s3_key, config=TRANSFER_CONFIG):
+        """Upload from any readable binary file object without buffering it.
+
+        The managed transfer streams multipart chunks straight off the file
+        object, so GB-scale artifacts (or pipe-like producers) upload in
+        constant memory.
+        """
+        self._s3.upload_fileobj(fileobj, self.bucket_name, s3_key,
+                                Config=config)
+
+    def list_prefix(self, prefix):
+        """Yield every object key under the given prefix.
+
+        One paginated list call returns 1000 keys per roundtrip, versus a
+        HEAD request per file when diffing a directory against the bucket.
+        """
+        paginator = self._s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+    def _walk_files(self, local_dir):
+        """Yield (path, s3-relative key, size) for every file under local_dir."""
+        stack = [str(local_dir)]
+        base = str(local_dir)
+        while stack:
+            current = stack.pop()
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        relative = os.path.relpath(entry.path, base)
+                        yield (entry.path, relative.replace(os.sep, '/'),
+                               entry.stat(follow_symlinks=False).st_size)
 
     def upload_directory(self, local_dir, s3_prefix):
-        """Upload entire directory to S3."""
+        """Upload entire directory to S3 with concurrent multipart uploads."""
         local_dir = Path(local_dir)
 
         if not local_dir.exists():
@@ -101,23 +217,94 @@ class S3Manager:
 
         print(f"Syncing {local_dir} to s3://{self.bucket_name}/{s3_prefix}")
 
-        success, output = self.run_aws_command([
-            's3', 'sync', str(local_dir), f's3://{self.bucket_name}/{s3_prefix}'
-        ])
+        # One paginated listing replaces a per-file existence check; files
+        # whose keys are already present in the bucket are skipped.
+        try:
+            existing = set(self.list_prefix(s3_prefix))
+        except (BotoCoreError, ClientError):
+            existing = set()
+
+        def upload_one(path, relative):
+            s3_key = f"{s3_prefix}/{relative}"
+            self._s3.upload_file(path, self.bucket_name, s3_key,
+                                 Config=TRANSFER_CONFIG)
+            return relative
+
+        # Largest files first: stragglers start early so the pool stays
+        # saturated instead of draining while one big upload finishes last.
+        pending = [
+            (path, relative) for path, relative, size in sorted(
+                self._walk_files(local_dir), key=lambda entry: -entry[2])
+            if f"{s3_prefix}/{relative}" not in existing
+        ]
+
+        success = True
+        futures = {
+            self._executor.submit(upload_one, path, relative): relative
+            for path, relative in pending
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except (BotoCoreError, ClientError) as e:
+                print(f"Upload failed for {futures[future]}: {e}")
+                success = False
 
         if success:
             print(f"Sync successful: {s3_prefix}")
         else:
-            print(f"Sync failed: {output}")
+            print(f"Sync completed with errors: {s3_prefix}")
+
+        return success
 
+    def copy_workflow_results(self, src_bucket, src_prefix, dst_prefix):
+        """Copy results bucket-to-bucket without routing bytes through the client.
+
+        Uses server-side multipart copy so the transfer stays inside S3;
+        a semaphore caps in-flight copies below the per-prefix write limit.
+        """
+        copy_config = TransferConfig(
+            multipart_chunksize=16 * 1024 * 1024,
+            max_concurrency=16
+        )
+        throttle = threading.Semaphore(UPLOAD_WORKERS)
+
+        def copy_one(key):
+            new_key = f"{dst_prefix}/{key[len(src_prefix):].lstrip('/')}"
+            with throttle:
+                self._s3.copy(
+                    {'Bucket': src_bucket, 'Key': key},
+                    self.bucket_name, new_key,
+                    Config=copy_config
+                )
+            return new_key
+
+        print(f"Copying s3://{src_bucket}/{src_prefix} "
+              f"to s3://{self.bucket_name}/{dst_prefix}")
+
+        paginator = self._s3.get_paginator('list_objects_v2')
+        success = True
+        copied = 0
+        futures = {}
+        for page in paginator.paginate(Bucket=src_bucket, Prefix=src_prefix):
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                futures[self._executor.submit(copy_one, key)] = key
+        for future in as_completed(futures):
+            try:
+                future.result()
+                copied += 1
+            except (BotoCoreError, ClientError) as e:
+                print(f"Copy failed for {futures[future]}: {e}")
+                success = False
+
+        print(f"Copied {copied} objects to {dst_prefix}")
         return success
 
     def generate_workflow_key(self, workflow_run):
         """Generate organized S3 key for workflow results."""
-        timestamp = datetime.now()
-        date_str = timestamp.strftime("%Y/%m/%d")
-        time_str = timestamp.strftime("%H-%M-%S")
-        return f"results/{date_str}/run-{workflow_run}-{time_str}"
+        # Single strftime pass, no intermediate datetime object.
+        return time.strftime(f"results/%Y/%m/%d/run-{workflow_run}-%H-%M-%S")
 
     def upload_workflow_results(self, result_dir, workflow_run, metadata=None):
         """Upload complete workflow results with metadata."""
@@ -126,9 +313,11 @@ class S3Manager:
 
         if metadata:
             metadata['s3_location'] = f"s3://{self.bucket_name}/{s3_key}"
+            # Atomic write: the directory sync never picks up a partial file.
             metadata_file = result_dir / "s3_metadata.json"
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            tmp = metadata_file.with_suffix('.json.tmp')
+            tmp.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+            os.replace(tmp, metadata_file)
 
         success = self.upload_directory(result_dir, s3_key)
 
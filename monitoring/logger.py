@@ -4,20 +4,35 @@ Advanced logging module for enterprise workflow monitoring.
 Provides structured logging with multiple output formats and levels.
 """
 
+import atexit
+import gzip
 import logging
-import json
+import logging.handlers
+import queue
 import sys
 import time
-from datetime import datetime
 from pathlib import Path
 from contextlib import contextmanager
 
+import orjson
+
 class JsonFormatter(logging.Formatter):
     """Custom formatter for JSON log output."""
 
+    # Timestamp string cache: records within the same second reuse the
+    # formatted value instead of re-running strftime per record.
+    _cached_sec = None
+    _cached_str = ''
+
     def format(self, record):
+        sec = int(record.created)
+        if sec != JsonFormatter._cached_sec:
+            JsonFormatter._cached_sec = sec
+            JsonFormatter._cached_str = time.strftime(
+                '%Y-%m-%dT%H:%M:%S', time.localtime(sec))
+
         log_entry = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'timestamp': JsonFormatter._cached_str,
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -25,12 +40,50 @@ class JsonFormatter(logging.Formatter):
             'function': record.funcName,
             'line': record.lineno
         }
-        return json.dumps(log_entry)
+        # Structured context passed via extra=; serialized exactly once here.
+        context = record.__dict__.get('context')
+        if context:
+            log_entry['context'] = context
+        return orjson.dumps(log_entry, default=str).decode()
+
+class GzipTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Timed rotating handler that gzip-compresses records at write time.
+
+    Structured log lines are highly redundant and compress well; level 1
+    keeps the CPU cost low, and compression runs on the listener thread
+    rather than the logging caller.
+    """
+
+    def _open(self):
+        return gzip.open(self.baseFilename, 'at', compresslevel=1,
+                         encoding=self.encoding or 'utf-8')
+
 
 class WorkflowLogger:
-    """Enterprise-grade logger for workflow automation."""
+    """Enterprise-grade logger for workflow automation.
+
+    Instances are cached per (name, log_dir): constructing the same
+    logger twice (dashboard plus tests, say) returns the existing object
+    instead of re-registering handlers and opening duplicate file
+    descriptors, while the same name pointed at a different directory
+    still gets its own instance.
+    """
+
+    _instances = {}
+
+    def __new__(cls, name="workflow", log_dir="logs"):
+        key = (name, str(Path(log_dir)))
+        if key in cls._instances:
+            return cls._instances[key]
+        instance = super().__new__(cls)
+        cls._instances[key] = instance
+        return instance
 
     def __init__(self, name="workflow", log_dir="logs"):
+        if getattr(self, '_initialized', False):
+            return
+        self._initialized = True
+
         self.name = name
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
@@ -39,99 +92,104 @@ class WorkflowLogger:
         self.logger.setLevel(logging.DEBUG)
         self.logger.handlers.clear()
 
-        self._setup_console_handler()
-        self._setup_file_handler()
-        self._setup_json_handler()
-
-    def _setup_console_handler(self):
-        """Setup console output with formatted messages."""
+        # The logger itself only enqueues records; a background listener
+        # thread does the formatting and disk/console writes, so calls
+        # inside timed blocks return without waiting on I/O.
+        self._queue = queue.Queue(-1)
+        self.logger.addHandler(logging.handlers.QueueHandler(self._queue))
+
+        self._listener = logging.handlers.QueueListener(
+            self._queue,
+            self._build_console_handler(),
+            self._build_file_handler(),
+            self._build_json_handler(),
+            respect_handler_level=True
+        )
+        self._listener.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    def close(self):
+        """Stop the background listener, flushing any queued records.
+
+        Idempotent, since atexit and explicit callers may both get here.
+        Handlers are closed explicitly so the gzip stream writes its
+        end-of-stream trailer and the file is fully readable. The
+        instance leaves the cache on close, so constructing the same
+        logger again builds a fresh one instead of returning a dead
+        singleton whose queue nothing drains.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._instances.pop((self.name, str(self.log_dir)), None)
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+    def _build_console_handler(self):
+        """Build console output handler with formatted messages."""
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
-
-    def _setup_file_handler(self):
-        """Setup file output for persistent logging."""
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        log_file = self.log_dir / f"{self.name}-{timestamp}.log"
-
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.DEBUG)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        return console_handler
 
-    def _setup_json_handler(self):
-        """Setup JSON output for structured logging."""
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        json_file = self.log_dir / f"{self.name}-{timestamp}.json"
+    def _build_file_handler(self):
+        """Build plaintext file handler for persistent logging.
 
-        json_handler = logging.FileHandler(json_file)
-        json_handler.setLevel(logging.INFO)
-        json_handler.setFormatter(JsonFormatter())
-        self.logger.addHandler(json_handler)
+        This is the human-readable artifact shipped with workflow runs;
+        it rotates at midnight alongside the JSON log.
+        """
+        log_file = self.log_dir / f"{self.name}.log"
 
-    def _setup_console_handler(self):
-        """Setup console output with formatted messages."""
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when='midnight'
         )
-        console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
-
-    def _setup_file_handler(self):
-        """Setup file output for persistent logging."""
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        log_file = self.log_dir / f"{self.name}-{timestamp}.log"
-
-        file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(logging.DEBUG)
         formatter = logging.Formatter(
             '%(asctime)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
         )
         file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        return file_handler
+
+    def _build_json_handler(self):
+        """Build JSON file handler for structured, persistent logging.
 
-    def _setup_json_handler(self):
-        """Setup JSON output for structured logging."""
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        json_file = self.log_dir / f"{self.name}-{timestamp}.json"
+        Uses midnight rotation so long-running monitors roll to a new file
+        per day instead of freezing the date chosen at construction time.
+        """
+        json_file = self.log_dir / f"{self.name}.json.gz"
 
-        json_handler = logging.FileHandler(json_file)
+        json_handler = GzipTimedRotatingFileHandler(
+            json_file, when='midnight'
+        )
         json_handler.setLevel(logging.INFO)
         json_handler.setFormatter(JsonFormatter())
-        self.logger.addHandler(json_handler)
+        return json_handler
+
+    @staticmethod
+    def _context(kwargs):
+        """Wrap kwargs for extra= so they never collide with LogRecord fields."""
+        return {'context': kwargs} if kwargs else None
 
     def info(self, message, **kwargs):
         """Log info level message with optional context."""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs)}"
-        self.logger.info(message)
+        self.logger.info(message, extra=self._context(kwargs))
 
     def error(self, message, **kwargs):
         """Log error level message with optional context."""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs)}"
-        self.logger.error(message)
+        self.logger.error(message, extra=self._context(kwargs))
 
     def warning(self, message, **kwargs):
         """Log warning level message with optional context."""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs)}"
-        self.logger.warning(message)
+        self.logger.warning(message, extra=self._context(kwargs))
 
     def debug(self, message, **kwargs):
         """Log debug level message with optional context."""
-        if kwargs:
-            message = f"{message} | Context: {json.dumps(kwargs)}"
-        self.logger.debug(message)
+        self.logger.debug(message, extra=self._context(kwargs))
 
     @contextmanager
     def timer(self, operation_name):
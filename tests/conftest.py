@@ -6,13 +6,142 @@ including service availability checks, model configuration, and output directori
 """
 
 import os
-import subprocess
 import tempfile
+import time
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Generator
 
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; xdist timing isolation is off
+    fcntl = None
+
+import httpx
 import pytest
 
+# Base URL for the local Ollama HTTP API (see https://github.com/ollama/ollama/blob/main/docs/api.md)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+
+
+class LatencyTracker:
+    """
+    Rolling EWMA of successful query latency for adaptive timeouts.
+
+    Instead of every call waiting out a fixed 60-90s ceiling when the
+    model hangs, the timeout tracks a conservative multiple of recent
+    response times: broken runs fail in seconds, healthy runs are
+    unaffected.
+    """
+
+    # Never time out below this (seconds); also the warm-path ceiling.
+    MIN_BUDGET = 30
+    # Used before any sample exists, when a cold load may be in play.
+    FIRST_CALL_BUDGET = 90
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.ewma = None
+
+    def update(self, elapsed):
+        """Fold a successful request's latency into the average."""
+        if self.ewma is None:
+            self.ewma = elapsed
+        else:
+            self.ewma = self.alpha * elapsed + (1 - self.alpha) * self.ewma
+
+    def budget(self):
+        """Return the timeout to allow the next request."""
+        if self.ewma is None:
+            return self.FIRST_CALL_BUDGET
+        return max(self.MIN_BUDGET, 3 * self.ewma)
+
+
+# Session-wide tracker shared by the generate helpers.
+_latency = LatencyTracker()
+
+
+def _generate_payload(model, prompt):
+    """Build the /api/generate request body shared by both helpers.
+
+    keep_alive=-1 pins the model in memory between calls so repeated
+    test queries measure inference, not reload time.
+    """
+    return {"model": model, "prompt": prompt,
+            "stream": False, "keep_alive": -1}
+
+
+def _generate_failure(error, start):
+    """Build the failure result for a request that never got a response."""
+    return SimpleNamespace(text="", error=error,
+                           elapsed=time.perf_counter() - start, ok=False,
+                           data={})
+
+
+def _generate_result(response, start):
+    """Turn an /api/generate response into the shared result shape.
+
+    Lives in one place so error derivation and the EWMA update cannot
+    drift between the sync and async helpers.
+    """
+    elapsed = time.perf_counter() - start
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+
+    error = data.get("error", "")
+    if response.status_code != 200 and not error:
+        error = f"HTTP {response.status_code}: {response.text}"
+
+    ok = response.status_code == 200 and not error
+    if ok:
+        _latency.update(elapsed)
+
+    return SimpleNamespace(
+        text=data.get("response", ""),
+        error=error,
+        elapsed=elapsed,
+        ok=ok,
+        data=data
+    )
+
+
+def ollama_generate(client, model, prompt, timeout=None):
+    """
+    Run a single generation through the Ollama HTTP API and time it.
+
+    Args:
+        client: The shared httpx.Client bound to the Ollama server.
+        model: Name of the model to query.
+        prompt: The prompt text to send.
+        timeout: Per-request timeout in seconds; None picks an adaptive
+            budget from the session latency EWMA.
+
+    Returns:
+        SimpleNamespace with the fields:
+            text (str): The generated response text ("" on failure).
+            error (str): Error detail from the API or transport ("" on success).
+            elapsed (float): Wall-clock seconds the request took.
+            ok (bool): True if the request succeeded.
+            data (dict): Parsed JSON body of the API response, including
+                Ollama's server-side timing fields ({} on transport failure).
+    """
+    if timeout is None:
+        timeout = _latency.budget()
+
+    start = time.perf_counter()
+    try:
+        response = client.post("/api/generate",
+                               json=_generate_payload(model, prompt),
+                               timeout=timeout)
+    except httpx.TimeoutException:
+        return _generate_failure("request timed out", start)
+    except httpx.HTTPError as exc:
+        return _generate_failure(str(exc) or type(exc).__name__, start)
+
+    return _generate_result(response, start)
+
 
 def pytest_configure(config):
     """Register custom pytest markers for test categorization."""
@@ -24,29 +153,167 @@ def pytest_configure(config):
         "markers",
         "advisory: marks tests as advisory - provide warnings but don't block workflow"
     )
+    config.addinivalue_line(
+        "markers",
+        "serial: marks timing-sensitive tests that must not overlap other tests "
+        "when the suite runs under pytest-xdist (-n auto)"
+    )
+
+
+@pytest.fixture(autouse=True)
+def _serial_lock(request):
+    """
+    Give @pytest.mark.serial tests the suite to themselves under xdist.
+
+    Cold-start and cache-delta measurements are meaningless if another
+    worker is querying the model at the same time — and a serial test's
+    model eviction would equally corrupt any warm-path timing running
+    beside it. Serial tests therefore take an exclusive cross-process
+    lock while every other test holds it shared: non-serial tests still
+    run in parallel with each other, but a serial test waits for them to
+    drain and blocks new ones while it measures.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = Path(tempfile.gettempdir()) / "ollama_serial_tests.lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    exclusive = request.node.get_closest_marker("serial") is not None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        # Closing the descriptor releases the flock.
+        os.close(fd)
+
+
+async def ollama_generate_async(client, model, prompt, timeout=None):
+    """
+    Async counterpart of ollama_generate for concurrent batches.
+
+    Args:
+        client: An httpx.AsyncClient bound to the Ollama server.
+        model: Name of the model to query.
+        prompt: The prompt text to send.
+        timeout: Per-request timeout in seconds; None picks an adaptive
+            budget from the session latency EWMA.
+
+    Returns:
+        SimpleNamespace with the same text/error/elapsed/ok/data fields
+        as ollama_generate.
+    """
+    if timeout is None:
+        timeout = _latency.budget()
+
+    start = time.perf_counter()
+    try:
+        response = await client.post("/api/generate",
+                                     json=_generate_payload(model, prompt),
+                                     timeout=timeout)
+    except httpx.TimeoutException:
+        return _generate_failure("request timed out", start)
+    except httpx.HTTPError as exc:
+        return _generate_failure(str(exc) or type(exc).__name__, start)
+
+    return _generate_result(response, start)
+
+
+@pytest.fixture(scope="session")
+def ollama_http() -> Generator[httpx.Client, None, None]:
+    """
+    Provide a session-scoped HTTP client for the Ollama API.
+
+    Yields:
+        httpx.Client: A client bound to the local Ollama server with keep-alive,
+        so all tests in the session share one TCP connection instead of forking
+        an `ollama` CLI process per call.
+    """
+    with httpx.Client(base_url=OLLAMA_BASE_URL, timeout=60) as client:
+        yield client
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _prewarm(ollama_http, model_name):
+    """
+    Load the model with a throwaway prompt before any test runs.
+
+    This pins the "warm" baseline: every timing threshold in the suite is
+    defined against warm-path behavior, so tests no longer depend on
+    whatever residency state a previous run happened to leave. The
+    cold-start test opts back out by explicitly evicting the model before
+    it measures. Errors are ignored here; availability has its own tests.
+    """
+    ollama_generate(ollama_http, model_name, "hi", timeout=120)
+    yield
 
 
 @pytest.fixture(scope="session")
-def ollama_available() -> bool:
+def warm_query_result(ollama_http, model_name, sample_prompt):
+    """
+    Run the standard timed query once per session and share the result.
+
+    Returns:
+        SimpleNamespace: The ollama_generate result (text/error/elapsed/ok)
+        for the sample prompt.
+
+    Note:
+        Several performance tests assert different properties of the same
+        warm-path query; sharing one inference avoids paying the model
+        compute once per test.
+    """
+    return ollama_generate(ollama_http, model_name, sample_prompt)
+
+
+@pytest.fixture(scope="session")
+def invalid_model_result(ollama_http):
+    """
+    Query a nonexistent model once per session and share the failure.
+
+    Returns:
+        SimpleNamespace: The ollama_generate result for a model that does
+        not exist.
+
+    Note:
+        Several reliability tests assert different properties of the same
+        failure (ok flag, error text, helpfulness); sharing one result
+        avoids a model-lookup roundtrip per test.
+    """
+    return ollama_generate(ollama_http, "nonexistent-model-xyz-12345", "test",
+                           timeout=30)
+
+
+@pytest.fixture(scope="session")
+def ollama_tags(ollama_http):
+    """
+    Fetch the model list from /api/tags once per session.
+
+    Returns:
+        httpx.Response | None: The cached tags response, or None if the
+        service is unreachable.
+
+    Note:
+        Several tests assert different properties of the same listing;
+        sharing one response avoids a network roundtrip per test.
+    """
+    try:
+        return ollama_http.get("/api/tags", timeout=10)
+    except httpx.HTTPError:
+        return None
+
+
+@pytest.fixture(scope="session")
+def ollama_available(ollama_tags) -> bool:
     """
     Check if Ollama service is available and responding.
-    
+
     Returns:
-        bool: True if Ollama is installed and the service responds, False otherwise.
-    
+        bool: True if the Ollama HTTP API responds, False otherwise.
+
     Note:
         This is a session-scoped fixture, so the check is performed once per test session.
     """
-    try:
-        result = subprocess.run(
-            ['ollama', '--version'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-        return False
+    return ollama_tags is not None and ollama_tags.status_code == 200
 
 
 @pytest.fixture(scope="session")
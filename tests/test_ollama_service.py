@@ -3,127 +3,112 @@ Service health tests for Ollama installation and availability.
 
 This module contains tests that validate the Ollama service is properly installed,
 configured, and responding to requests. Tests are categorized as critical or advisory.
+All service checks go through the Ollama HTTP API over a shared keep-alive client
+rather than forking the `ollama` CLI per test.
 """
 
-import os
-import subprocess
-from pathlib import Path
+import json
 
 import pytest
 
 
 @pytest.mark.critical
-def test_ollama_installed(ollama_available):
+def test_ollama_installed(ollama_http):
     """
-    Verify that Ollama is installed and the binary is executable.
-    
-    This test checks if the 'ollama --version' command executes successfully,
-    which confirms the Ollama binary is accessible in the system PATH.
-    
+    Verify that Ollama is installed and reports a version.
+
+    This test queries the /api/version endpoint, which confirms the Ollama
+    server is installed and able to answer requests.
+
     Args:
-        ollama_available: Fixture that checks Ollama service availability.
+        ollama_http: Fixture providing the shared Ollama HTTP client.
     """
-    result = subprocess.run(
-        ['ollama', '--version'],
-        capture_output=True,
-        text=True,
-        timeout=5
-    )
-    
-    assert result.returncode == 0, (
-        f"Ollama command failed with exit code {result.returncode}. "
-        f"stderr: {result.stderr}"
+    response = ollama_http.get("/api/version", timeout=5)
+
+    assert response.status_code == 200, (
+        f"Ollama version endpoint failed with status {response.status_code}. "
+        f"body: {response.text}"
     )
-    assert 'ollama version' in result.stdout.lower(), (
-        f"Unexpected version output format. "
-        f"Expected 'ollama version' in output, got: {result.stdout}"
+    assert response.json().get("version"), (
+        f"Unexpected version response format. "
+        f"Expected a 'version' field, got: {response.text}"
     )
 
 
 @pytest.mark.critical
-def test_ollama_service_responding(ollama_available):
+def test_ollama_service_responding(ollama_available, ollama_tags):
     """
     Verify that the Ollama service is running and responding to requests.
-    
-    This test attempts to list available models, which requires the Ollama
-    service to be actively running and accepting connections.
-    
+
+    This test checks the session-cached /api/tags listing, which requires the
+    Ollama service to be actively running and accepting connections.
+
     Args:
         ollama_available: Fixture that checks Ollama service availability.
+        ollama_tags: Fixture providing the cached model list response.
     """
     assert ollama_available, (
         "Ollama service is not available. "
         "Ensure 'ollama serve' is running in the background."
     )
-    
-    result = subprocess.run(
-        ['ollama', 'list'],
-        capture_output=True,
-        text=True,
-        timeout=10
-    )
-    
-    assert result.returncode == 0, (
-        f"Ollama service not responding. Command 'ollama list' failed with "
-        f"exit code {result.returncode}. stderr: {result.stderr}"
+
+    assert ollama_tags.status_code == 200, (
+        f"Ollama service not responding. GET /api/tags returned "
+        f"status {ollama_tags.status_code}. body: {ollama_tags.text}"
     )
 
 
 @pytest.mark.critical
-def test_model_available(model_name):
+def test_model_available(ollama_tags, model_name):
     """
     Verify that the required model is downloaded and available.
-    
+
     This test checks that the specified model (default: llama3.2:1b) appears
-    in the list of available models, confirming it has been pulled successfully.
-    
+    in the session-cached /api/tags model list, confirming it has been pulled
+    successfully.
+
     Args:
+        ollama_tags: Fixture providing the cached model list response.
         model_name: Fixture providing the name of the model to test.
     """
-    result = subprocess.run(
-        ['ollama', 'list'],
-        capture_output=True,
-        text=True,
-        timeout=10
-    )
-    
-    assert result.returncode == 0, (
-        f"Failed to list models. Exit code: {result.returncode}, "
-        f"stderr: {result.stderr}"
+    assert ollama_tags is not None and ollama_tags.status_code == 200, (
+        "Failed to list models: Ollama service is unreachable or errored."
     )
-    
-    assert model_name in result.stdout, (
+
+    available = [model.get("name", "") for model in ollama_tags.json().get("models", [])]
+
+    assert model_name in available, (
         f"Required model '{model_name}' not found in available models. "
         f"Run 'ollama pull {model_name}' to download it. "
-        f"Available models:\n{result.stdout}"
+        f"Available models: {available}"
     )
 
 
 @pytest.mark.critical
-def test_model_loads_successfully(model_name, sample_prompt):
+def test_model_loads_successfully(ollama_http, model_name, sample_prompt):
     """
     Verify that the model can be loaded and process a simple prompt.
-    
+
     This test runs a basic inference request to ensure the model loads
     correctly and can generate a response without errors.
-    
+
     Args:
+        ollama_http: Fixture providing the shared Ollama HTTP client.
         model_name: Fixture providing the name of the model to test.
         sample_prompt: Fixture providing a standard test prompt.
     """
-    result = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
+    response = ollama_http.post(
+        "/api/generate",
+        json={"model": model_name, "prompt": sample_prompt, "stream": False},
         timeout=60
     )
-    
-    assert result.returncode == 0, (
+
+    assert response.status_code == 200, (
         f"Model '{model_name}' failed to process prompt. "
-        f"Exit code: {result.returncode}, stderr: {result.stderr}"
+        f"Status: {response.status_code}, body: {response.text}"
     )
-    
-    assert len(result.stdout.strip()) > 0, (
+
+    assert len(response.json().get("response", "").strip()) > 0, (
         f"Model '{model_name}' produced empty output. "
         f"Expected a response to prompt: '{sample_prompt}'"
     )
@@ -133,11 +118,11 @@ def test_model_loads_successfully(model_name, sample_prompt):
 def test_cache_directory_exists(cache_dir):
     """
     Verify that the Ollama binary cache directory exists.
-    
+
     This is an advisory test that checks if the caching mechanism used
     in GitHub Actions is properly configured. Failure indicates caching
     may not be working but doesn't prevent Ollama from functioning.
-    
+
     Args:
         cache_dir: Fixture providing the path to the cache directory.
     """
@@ -145,7 +130,7 @@ def test_cache_directory_exists(cache_dir):
         f"Cache directory not found at {cache_dir}. "
         f"This may indicate caching is not configured or this is the first run."
     )
-    
+
     assert cache_dir.is_dir(), (
         f"Cache path exists but is not a directory: {cache_dir}"
     )
@@ -155,10 +140,10 @@ def test_cache_directory_exists(cache_dir):
 def test_ollama_home_exists(ollama_home):
     """
     Verify that the Ollama home directory exists.
-    
+
     This advisory test checks for the ~/.ollama directory where Ollama
     stores models and configuration. Useful for debugging storage issues.
-    
+
     Args:
         ollama_home: Fixture providing the path to the Ollama home directory.
     """
@@ -166,7 +151,7 @@ def test_ollama_home_exists(ollama_home):
         f"Ollama home directory not found at {ollama_home}. "
         f"This may indicate Ollama has not been initialized properly."
     )
-    
+
     assert ollama_home.is_dir(), (
         f"Ollama home path exists but is not a directory: {ollama_home}"
     )
@@ -176,18 +161,18 @@ def test_ollama_home_exists(ollama_home):
 def test_ollama_models_directory(ollama_home):
     """
     Verify that the Ollama models directory exists and contains data.
-    
+
     This advisory test checks if the models subdirectory exists in the
     Ollama home, which indicates models have been downloaded.
-    
+
     Args:
         ollama_home: Fixture providing the path to the Ollama home directory.
     """
     models_dir = ollama_home / "models"
-    
+
     if not ollama_home.exists():
         pytest.skip(f"Ollama home directory not found at {ollama_home}")
-    
+
     assert models_dir.exists(), (
         f"Models directory not found at {models_dir}. "
         f"Models may not be downloaded or stored in a different location."
@@ -195,49 +180,57 @@ def test_ollama_models_directory(ollama_home):
 
 
 @pytest.mark.critical
-def test_response_quality(model_name, simple_query_prompt, test_output_dir):
+def test_response_quality(ollama_http, model_name, simple_query_prompt, test_output_dir):
     """
     Verify that the model produces coherent, non-empty responses.
-    
-    This test validates that the AI model not only runs but produces
-    meaningful output. The response is saved to the test output directory
-    for inspection if needed.
-    
+
+    The whole completion is consumed: the error-indicator scan and the
+    saved debugging artifact are only meaningful over the full text. The
+    fast early-exit path for "did anything arrive at all" lives in
+    test_response_not_empty.
+
     Args:
+        ollama_http: Fixture providing the shared Ollama HTTP client.
         model_name: Fixture providing the name of the model to test.
         simple_query_prompt: Fixture providing a simple query prompt.
         test_output_dir: Fixture providing a temporary output directory.
     """
-    result = subprocess.run(
-        ['ollama', 'run', model_name, simple_query_prompt],
-        capture_output=True,
-        text=True,
+    buffer = ""
+    with ollama_http.stream(
+        "POST", "/api/generate",
+        json={"model": model_name, "prompt": simple_query_prompt, "stream": True},
         timeout=60
-    )
-    
-    assert result.returncode == 0, (
-        f"Failed to generate response. Exit code: {result.returncode}, "
-        f"stderr: {result.stderr}"
-    )
-    
-    response = result.stdout.strip()
-    
+    ) as response:
+        assert response.status_code == 200, (
+            f"Failed to generate response. Status: {response.status_code}"
+        )
+
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            buffer += chunk.get("response", "")
+            if chunk.get("done"):
+                break
+
+    text = buffer.strip()
+
     # Save response for debugging
     output_file = test_output_dir / "test_response.txt"
-    output_file.write_text(response)
-    
-    assert len(response) > 10, (
+    output_file.write_text(text)
+
+    assert len(text) > 10, (
         f"Response too short (< 10 characters). "
-        f"Expected meaningful output, got: '{response}'. "
+        f"Expected meaningful output, got: '{text}'. "
         f"Full response saved to: {output_file}"
     )
-    
+
     # Check for common error patterns
     error_indicators = ['error', 'failed', 'exception', 'traceback']
-    response_lower = response.lower()
-    
+    response_lower = text.lower()
+
     for indicator in error_indicators:
         assert indicator not in response_lower, (
             f"Response contains error indicator '{indicator}'. "
-            f"Response: {response}"
+            f"Response: {text}"
         )
@@ -3,26 +3,64 @@ Performance tests for Ollama service response times and baselines.
 
 This module contains tests that measure and validate the performance
 characteristics of the Ollama service, including response times,
-cold start performance, and cache effectiveness.
+cold start performance, and cache effectiveness. Queries go through
+the shared keep-alive HTTP client so measurements reflect inference
+time rather than CLI process startup.
 """
 
 import getpass
-import subprocess
+import json
+import os
 import time
-from datetime import datetime
 from pathlib import Path
 
+import httpx
 import pytest
 
+from tests.conftest import ollama_generate
+
 
 # Performance thresholds (in seconds)
 MAX_RESPONSE_TIME = 30      # Hard fail if query exceeds this
 WARN_RESPONSE_TIME = 15     # Advisory warning if query exceeds this
 MAX_COLD_START_TIME = 45    # Maximum allowed time for cold start
 
+# A warm query should serve the model from memory; load_duration above
+# this (nanoseconds) means the cache is not holding between queries.
+MAX_WARM_LOAD_NS = 500_000_000
+
 # Log file path
 PERFORMANCE_LOG_FILE = Path(__file__).parent / "performance_log.txt"
 
+# The user never changes mid-run; resolve it once instead of hitting
+# the passwd database on every log entry.
+_USER = getpass.getuser()
+
+# Singleton raw fd for the performance log, opened on first use. O_APPEND
+# makes each os.write an atomic append, so xdist workers can log in
+# parallel without interleaved entries, and there is no TextIOWrapper
+# encoding or locking on the write path.
+_PERF_LOG_FD = None
+
+
+def _perf_log_fd():
+    """Return the shared append-mode fd for the performance log."""
+    global _PERF_LOG_FD
+    if _PERF_LOG_FD is None:
+        _PERF_LOG_FD = os.open(PERFORMANCE_LOG_FILE,
+                               os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    return _PERF_LOG_FD
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _perf_log_session():
+    """Close the performance log fd at session teardown."""
+    yield
+    global _PERF_LOG_FD
+    if _PERF_LOG_FD is not None:
+        os.close(_PERF_LOG_FD)
+        _PERF_LOG_FD = None
+
 
 def log_timing(test_name: str, message: str) -> None:
     """
@@ -34,57 +72,80 @@ def log_timing(test_name: str, message: str) -> None:
         test_name: Name of the test function.
         message: The timing message to log.
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    user = getpass.getuser()
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
 
-    log_entry = f"[{timestamp}] User: {user} | Test: {test_name} | {message}\n"
+    log_entry = f"[{timestamp}] User: {_USER} | Test: {test_name} | {message}\n"
 
-    # Append to log file
-    with open(PERFORMANCE_LOG_FILE, "a") as f:
-        f.write(log_entry)
+    # Single atomic append; one write per entry keeps workers from
+    # interleaving mid-line.
+    os.write(_perf_log_fd(), log_entry.encode('utf-8'))
 
     # Also print to console
     print(f"\n{message}")
 
 
-@pytest.mark.critical
-def test_ai_response_time(model_name, sample_prompt):
+def require_and_log(result, test_name: str, label: str) -> float:
     """
-    Verify that AI query completes within 30 seconds.
+    Assert a generate result succeeded and log its elapsed time.
 
-    This test measures the time taken for a standard query
-    and fails if it exceeds the maximum threshold.
+    Collapses the assert-ok/log-timing block every timing test repeated
+    into one call.
 
     Args:
-        model_name: Fixture providing the model name.
-        sample_prompt: Fixture providing a test prompt.
+        result: An ollama_generate result namespace.
+        test_name: Name of the calling test, for the log entry.
+        label: Human-readable label for the measurement.
+
+    Returns:
+        float: The elapsed time of the query in seconds.
     """
-    start_time = time.time()
+    assert result.ok, f"Query failed: {result.error}"
+    log_timing(test_name, f"{label}: {result.elapsed:.2f}s")
+    return result.elapsed
 
-    result = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
-        timeout=60
-    )
 
-    elapsed_time = time.time() - start_time
+@pytest.fixture(scope="module", autouse=True)
+def _require_model(ollama_tags, model_name):
+    """
+    Skip the perf module up front when the model is not installed.
+
+    Without this gate a missing model makes every timing test run out its
+    full 30-90s budget waiting on a query that can never succeed; one look
+    at the cached model listing turns minutes of timeouts into an
+    immediate skip. Service availability itself stays covered by the
+    reliability tests, which this gate does not touch.
+    """
+    if ollama_tags is None or ollama_tags.status_code != 200:
+        pytest.skip("Ollama service unavailable, skipping performance tests")
 
-    assert result.returncode == 0, (
-        f"Query failed with exit code {result.returncode}. "
-        f"stderr: {result.stderr}"
-    )
+    models = [m.get("name", "") for m in ollama_tags.json().get("models", [])]
+    if not any(name.startswith(model_name) for name in models):
+        pytest.skip(f"Model {model_name} not installed, "
+                    "skipping performance tests")
 
-    log_timing("test_ai_response_time", f"AI response time: {elapsed_time:.2f}s")
 
-    assert elapsed_time < MAX_RESPONSE_TIME, (
-        f"AI response took {elapsed_time:.2f}s, "
+@pytest.mark.critical
+def test_ai_response_time(warm_query_result):
+    """
+    Verify that AI query completes within 30 seconds.
+
+    This test checks the timing of the session-shared standard query
+    and fails if it exceeds the maximum threshold.
+
+    Args:
+        warm_query_result: Fixture providing the shared timed query result.
+    """
+    elapsed = require_and_log(warm_query_result, "test_ai_response_time",
+                              "AI response time")
+
+    assert elapsed < MAX_RESPONSE_TIME, (
+        f"AI response took {elapsed:.2f}s, "
         f"exceeding maximum threshold of {MAX_RESPONSE_TIME}s"
     )
 
 
 @pytest.mark.advisory
-def test_ai_response_time_warning(model_name, sample_prompt):
+def test_ai_response_time_warning(warm_query_result):
     """
     Warn if AI query takes longer than 15 seconds.
 
@@ -92,174 +153,176 @@ def test_ai_response_time_warning(model_name, sample_prompt):
     exceeds the optimal threshold, but does not fail the test.
 
     Args:
-        model_name: Fixture providing the model name.
-        sample_prompt: Fixture providing a test prompt.
+        warm_query_result: Fixture providing the shared timed query result.
     """
-    start_time = time.time()
+    elapsed = require_and_log(warm_query_result, "test_ai_response_time_warning",
+                              "AI response time")
 
-    result = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
-        timeout=60
-    )
+    if elapsed > WARN_RESPONSE_TIME:
+        pytest.skip(
+            f"ADVISORY: Response time {elapsed:.2f}s exceeds "
+            f"optimal threshold of {WARN_RESPONSE_TIME}s"
+        )
 
-    elapsed_time = time.time() - start_time
 
-    assert result.returncode == 0, (
-        f"Query failed with exit code {result.returncode}. "
-        f"stderr: {result.stderr}"
-    )
+def _force_cold(client, model_name):
+    """
+    Evict the model so the next query measures a genuine cold start.
 
-    log_timing("test_ai_response_time_warning", f"AI response time: {elapsed_time:.2f}s")
+    Asks Ollama to unload the model (keep_alive=0), then drops the model
+    blobs from the OS page cache where posix_fadvise is available. Without
+    this, a recent run leaves the weights resident and the "cold start"
+    test silently measures a warm load.
 
-    if elapsed_time > WARN_RESPONSE_TIME:
-        pytest.skip(
-            f"ADVISORY: Response time {elapsed_time:.2f}s exceeds "
-            f"optimal threshold of {WARN_RESPONSE_TIME}s"
-        )
+    Args:
+        client: The shared Ollama HTTP client.
+        model_name: Name of the model to evict.
+    """
+    try:
+        client.post("/api/generate",
+                    json={"model": model_name, "keep_alive": 0},
+                    timeout=30)
+    except httpx.HTTPError:
+        pass  # Service down; the test itself will report the failure.
+
+    if hasattr(os, 'posix_fadvise'):
+        blobs_dir = Path.home() / ".ollama" / "models" / "blobs"
+        if blobs_dir.is_dir():
+            for blob in blobs_dir.iterdir():
+                if not blob.is_file():
+                    continue
+                fd = os.open(blob, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                finally:
+                    os.close(fd)
 
 
 @pytest.mark.critical
-def test_model_load_time(model_name, sample_prompt):
+@pytest.mark.serial
+def test_model_load_time(ollama_http, model_name, sample_prompt):
     """
     Verify that first query (cold start) completes within 45 seconds.
 
-    The first query may include model loading time, so we allow
-    a longer threshold for cold start scenarios.
+    The model is explicitly unloaded and its weights evicted from the page
+    cache before measuring, so the query really includes model load time
+    rather than whatever warmth earlier tests left behind.
 
     Args:
+        ollama_http: Fixture providing the shared Ollama HTTP client.
         model_name: Fixture providing the model name.
         sample_prompt: Fixture providing a test prompt.
     """
-    start_time = time.time()
+    _force_cold(ollama_http, model_name)
 
-    result = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
-        timeout=90
-    )
-
-    elapsed_time = time.time() - start_time
-
-    assert result.returncode == 0, (
-        f"Cold start query failed with exit code {result.returncode}. "
-        f"stderr: {result.stderr}"
-    )
+    result = ollama_generate(ollama_http, model_name, sample_prompt, timeout=90)
 
-    log_timing("test_model_load_time", f"Model load time (cold start): {elapsed_time:.2f}s")
+    elapsed = require_and_log(result, "test_model_load_time",
+                              "Model load time (cold start)")
 
-    assert elapsed_time < MAX_COLD_START_TIME, (
-        f"Cold start took {elapsed_time:.2f}s, "
+    assert elapsed < MAX_COLD_START_TIME, (
+        f"Cold start took {elapsed:.2f}s, "
         f"exceeding maximum threshold of {MAX_COLD_START_TIME}s"
     )
 
 
 @pytest.mark.advisory
-def test_cache_improves_performance(model_name, sample_prompt, test_output_dir):
+@pytest.mark.serial
+def test_cache_improves_performance(model_name, warm_query_result,
+                                    test_output_dir):
     """
-    Verify that second query is faster than first query.
+    Verify the model stays cached in memory between queries.
 
-    After the model is loaded into memory, subsequent queries
-    should complete faster due to caching effects.
+    Ollama reports server-side timings with every response, so instead of
+    running two end-to-end queries and subtracting noisy wall clocks, this
+    reads load_duration from the session's shared warm query: near zero
+    means the model was served from memory, large means every query is
+    paying a reload.
 
     Args:
         model_name: Fixture providing the model name.
-        sample_prompt: Fixture providing a test prompt.
+        warm_query_result: Fixture providing the shared warm-query result.
         test_output_dir: Fixture providing output directory for timing report.
     """
-    # First query (cold or warm start)
-    start_time_1 = time.time()
-
-    result_1 = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
-        timeout=90
-    )
+    require_and_log(warm_query_result, "test_cache_improves_performance",
+                    "Warm query time")
 
-    elapsed_time_1 = time.time() - start_time_1
-
-    assert result_1.returncode == 0, (
-        f"First query failed with exit code {result_1.returncode}. "
-        f"stderr: {result_1.stderr}"
-    )
+    data = warm_query_result.data
+    load_ns = data.get("load_duration")
+    assert load_ns is not None, "Response should include load_duration"
 
-    # Second query (should be cached/warm)
-    start_time_2 = time.time()
-
-    result_2 = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
-        timeout=60
-    )
-
-    elapsed_time_2 = time.time() - start_time_2
-
-    assert result_2.returncode == 0, (
-        f"Second query failed with exit code {result_2.returncode}. "
-        f"stderr: {result_2.stderr}"
-    )
-
-    # Save timing report
+    # Save timing report (durations are reported in nanoseconds)
     timing_report = test_output_dir / "timing_report.txt"
     timing_report.write_text(
         f"Cache Performance Report\n"
         f"========================\n"
         f"Model: {model_name}\n"
-        f"First query time: {elapsed_time_1:.3f}s\n"
-        f"Second query time: {elapsed_time_2:.3f}s\n"
-        f"Improvement: {elapsed_time_1 - elapsed_time_2:.3f}s\n"
-        f"Cache effective: {elapsed_time_2 < elapsed_time_1}\n"
+        f"Total duration: {data.get('total_duration', 0) / 1e9:.3f}s\n"
+        f"Load duration: {load_ns / 1e9:.3f}s\n"
+        f"Prompt eval duration: {data.get('prompt_eval_duration', 0) / 1e9:.3f}s\n"
+        f"Eval duration: {data.get('eval_duration', 0) / 1e9:.3f}s\n"
+        f"Cache effective: {load_ns < MAX_WARM_LOAD_NS}\n"
     )
 
-    log_timing("test_cache_improves_performance", f"First query time: {elapsed_time_1:.2f}s")
-    log_timing("test_cache_improves_performance", f"Second query time: {elapsed_time_2:.2f}s")
     log_timing("test_cache_improves_performance", f"Timing report saved to: {timing_report}")
 
-    assert elapsed_time_2 < elapsed_time_1, (
-        f"Cache did not improve performance. "
-        f"First query: {elapsed_time_1:.2f}s, "
-        f"Second query: {elapsed_time_2:.2f}s"
+    assert load_ns < MAX_WARM_LOAD_NS, (
+        f"Model reloaded on a warm query: load_duration was "
+        f"{load_ns / 1e9:.2f}s after prewarm"
     )
 
 
 @pytest.mark.critical
-def test_response_not_empty(model_name, sample_prompt):
+def test_response_not_empty(ollama_http, model_name, sample_prompt):
     """
     Verify that AI response contains actual content.
 
-    This test ensures the model produces meaningful output,
-    not just empty or whitespace-only responses.
+    The test only needs to know that some non-whitespace output arrives,
+    so it scans the generation stream as raw bytes and stops at the first
+    real token: memory stays constant no matter how long the response
+    would have been, and the cost is time-to-first-token rather than a
+    full completion.
 
     Args:
+        ollama_http: Fixture providing the shared Ollama HTTP client.
         model_name: Fixture providing the model name.
         sample_prompt: Fixture providing a test prompt.
     """
-    result = subprocess.run(
-        ['ollama', 'run', model_name, sample_prompt],
-        capture_output=True,
-        text=True,
-        timeout=60
-    )
-
-    assert result.returncode == 0, (
-        f"Query failed with exit code {result.returncode}. "
-        f"stderr: {result.stderr}"
-    )
-
-    response = result.stdout.strip()
+    start = time.perf_counter()
+    has_content = False
 
-    log_timing("test_response_not_empty", f"Response length: {len(response)} characters")
+    with ollama_http.stream(
+        "POST", "/api/generate",
+        json={"model": model_name, "prompt": sample_prompt,
+              "stream": True, "keep_alive": -1},
+        timeout=60
+    ) as response:
+        assert response.status_code == 200, (
+            f"Query failed with status {response.status_code}"
+        )
 
-    assert len(response) > 0, (
-        f"AI response is empty. "
+        # Small raw chunks instead of decoded lines: only the bytes of
+        # the current NDJSON record are ever held in memory.
+        pending = b""
+        for chunk in response.iter_raw(1024):
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if not line:
+                    continue
+                token = json.loads(line).get("response", "")
+                if token.strip():
+                    # Leaving the stream context closes the connection
+                    # and cancels the rest of the generation.
+                    has_content = True
+                    break
+            if has_content:
+                break
+
+    ttft = time.perf_counter() - start
+    log_timing("test_response_not_empty", f"Time to first token: {ttft:.2f}s")
+
+    assert has_content, (
+        f"AI response contained no non-whitespace content. "
         f"Expected actual content for prompt: '{sample_prompt}'"
     )
-
-    assert not response.isspace(), (
-        f"AI response contains only whitespace. "
-        f"Expected meaningful content."
-    )
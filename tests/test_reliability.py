@@ -1,82 +1,100 @@
 """
 Reliability Tests for Ollama AI Workflow
 Tests failure modes and graceful error handling
+
+All queries go through the shared keep-alive HTTP client; invalid models
+surface as API error responses rather than nonzero CLI exit codes.
 """
 
-import subprocess
-import pytest
+import asyncio
+import re
 import time
-import sys
+
+import httpx
+import pytest
+
+from tests.conftest import OLLAMA_BASE_URL, ollama_generate, ollama_generate_async
+
+# Precompiled alternations scan the error text once in C rather than one
+# Python-level substring pass per keyword.
+_INVALID_MODEL_RE = re.compile(r"not found|error|failed|pull|unknown",
+                               re.IGNORECASE)
+_HELPFUL_RE = re.compile(
+    r"not found|error|pull|try|model|failed|unable|does not exist",
+    re.IGNORECASE)
+
+
+def gather_generations(prompts, timeout=None):
+    """Run (model, prompt) pairs concurrently and return results in order.
+
+    Wall-clock is roughly the slowest single request plus queueing, rather
+    than the sum of sequential request latencies. With timeout=None each
+    request gets the adaptive EWMA budget from conftest.
+
+    http2=True lets the batch multiplex over one connection when the
+    server negotiates HTTP/2; otherwise httpx falls back to pooled
+    HTTP/1.1 connections.
+    """
+    async def _run_all():
+        async with httpx.AsyncClient(base_url=OLLAMA_BASE_URL,
+                                     http2=True, timeout=60) as client:
+            tasks = [ollama_generate_async(client, model, prompt, timeout)
+                     for model, prompt in prompts]
+            return await asyncio.gather(*tasks)
+
+    return asyncio.run(_run_all())
 
 
 class TestReliability:
     """Test suite for reliability and error handling"""
 
-    def test_handles_invalid_model(self):
+    def test_handles_invalid_model(self, invalid_model_result):
         """Test graceful failure with non-existent model"""
-        result = subprocess.run(
-            ["ollama", "run", "nonexistent-model-xyz", "hello"],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        result = invalid_model_result
 
-        # Should return non-zero exit code for invalid model
-        assert result.returncode != 0, "Expected non-zero exit code for invalid model"
+        # Should report failure for invalid model
+        assert not result.ok, "Expected failure for invalid model"
 
-        # Error message should be in stderr
-        assert result.stderr, "Expected error message in stderr"
+        # Error detail should be populated
+        assert result.error, "Expected error message for invalid model"
 
         # Error should mention the model or indicate it's not found
-        error_lower = result.stderr.lower()
-        assert any(word in error_lower for word in ["not found", "error", "failed", "pull", "unknown"]), \
-            f"Error message should indicate model issue: {result.stderr}"
+        assert _INVALID_MODEL_RE.search(result.error), \
+            f"Error message should indicate model issue: {result.error}"
 
-    def test_handles_empty_prompt(self):
+    def test_handles_empty_prompt(self, ollama_http):
         """Test appropriate response to empty input"""
-        result = subprocess.run(
-            ["ollama", "run", "llama3.2:1b", ""],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
+        result = ollama_generate(ollama_http, "llama3.2:1b", "")
 
         # Empty prompt should either succeed with empty/minimal response
         # or fail gracefully - either is acceptable
-        if result.returncode == 0:
+        if result.ok:
             # If it succeeds, output should exist (even if minimal)
-            assert isinstance(result.stdout, str), "Output should be a string"
+            assert isinstance(result.text, str), "Output should be a string"
         else:
             # If it fails, should have meaningful error
-            assert result.stderr or result.stdout, "Should have some output on failure"
+            assert result.error, "Should have some output on failure"
 
-    def test_handles_timeout(self):
+    def test_handles_timeout(self, ollama_http, model_name):
         """Test behavior when query times out"""
-        timed_out = False
-        start_time = time.time()
-
-        try:
-            # Use a very short timeout to force timeout condition
-            result = subprocess.run(
-                ["ollama", "run", "llama3.2:1b", "Write a 10000 word essay about the universe"],
-                capture_output=True,
-                text=True,
-                timeout=5  # Very short timeout
-            )
-        except subprocess.TimeoutExpired:
-            timed_out = True
-
-        elapsed = time.time() - start_time
-
-        # Either timeout occurred OR completed within reasonable time
-        assert timed_out or elapsed < 60, \
-            "Query should either timeout or complete within reasonable time"
-
-        if timed_out:
-            # Verify timeout happened around expected time
-            assert elapsed < 10, "Timeout should trigger within expected window"
-
-    def test_partial_failure_recovery(self):
+        start_time = time.perf_counter()
+
+        # A 50ms budget cannot cover a generation round-trip, so the
+        # timeout path triggers deterministically regardless of model
+        # speed and the test doesn't burn seconds of real inference.
+        result = ollama_generate(ollama_http, model_name,
+                                 "Write an essay about the universe",
+                                 timeout=0.05)
+
+        elapsed = time.perf_counter() - start_time
+
+        # The helper must surface the timeout as a graceful failure
+        assert not result.ok, "A 50ms budget should not complete a generation"
+        assert "timed out" in result.error, \
+            f"Timeout should be reported as such, got: {result.error}"
+        assert elapsed < 2, "Timeout should trigger within expected window"
+
+    def test_partial_failure_recovery(self, ollama_http):
         """Test that workflow continues after non-critical failure"""
         results = []
 
@@ -88,32 +106,12 @@ class TestReliability:
         ]
 
         for model, prompt, should_succeed in test_cases:
-            try:
-                result = subprocess.run(
-                    ["ollama", "run", model, prompt],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                results.append({
-                    "model": model,
-                    "success": result.returncode == 0,
-                    "expected": should_succeed
-                })
-            except subprocess.TimeoutExpired:
-                results.append({
-                    "model": model,
-                    "success": False,
-                    "expected": should_succeed,
-                    "timeout": True
-                })
-            except Exception as e:
-                results.append({
-                    "model": model,
-                    "success": False,
-                    "expected": should_succeed,
-                    "error": str(e)
-                })
+            result = ollama_generate(ollama_http, model, prompt)
+            results.append({
+                "model": model,
+                "success": result.ok,
+                "expected": should_succeed
+            })
 
         # All test cases should have been attempted (no early exit)
         assert len(results) == len(test_cases), \
@@ -125,76 +123,43 @@ class TestReliability:
                 assert result["success"], \
                     f"Model {result['model']} should have succeeded"
 
-    def test_error_messages_helpful(self):
+    def test_error_messages_helpful(self, invalid_model_result):
         """Test that error output contains actionable information"""
-        result = subprocess.run(
-            ["ollama", "run", "this-model-does-not-exist-12345", "test"],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        result = invalid_model_result
 
         # Should fail
-        assert result.returncode != 0, "Invalid model should fail"
+        assert not result.ok, "Invalid model should fail"
 
         # Combine all output for checking
-        all_output = (result.stderr + result.stdout).lower()
+        all_output = result.error + result.text
 
         # Error message should contain helpful information
-        helpful_indicators = [
-            "not found",
-            "error",
-            "pull",
-            "try",
-            "model",
-            "failed",
-            "unable",
-            "does not exist"
-        ]
-
-        has_helpful_info = any(indicator in all_output for indicator in helpful_indicators)
-        assert has_helpful_info, \
-            f"Error should contain actionable info. Got: {result.stderr or result.stdout}"
+        assert _HELPFUL_RE.search(all_output), \
+            f"Error should contain actionable info. Got: {result.error or result.text}"
 
 
 class TestFailureModes:
     """Verify the system fails gracefully"""
 
-    def test_invalid_model_returns_nonzero(self):
-        """Invalid model names return non-zero exit code"""
-        result = subprocess.run(
-            ["ollama", "run", "fake_model_xyz_123", "test"],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-
-        assert result.returncode != 0, \
-            "Invalid model should return non-zero exit code"
+    def test_invalid_model_fails(self, invalid_model_result):
+        """Invalid model names report failure"""
+        assert not invalid_model_result.ok, \
+            "Invalid model should report failure"
 
-    def test_error_messages_captured_in_stderr(self):
-        """Error messages are captured in stderr"""
-        result = subprocess.run(
-            ["ollama", "run", "nonexistent_model_abc", "test"],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+    def test_error_messages_captured(self, invalid_model_result):
+        """Error messages are captured on failure"""
+        result = invalid_model_result
 
-        # Error info should be in stderr (or stdout for some error types)
-        has_error_output = bool(result.stderr) or (
-            result.returncode != 0 and bool(result.stdout)
+        # Error info should be surfaced by the API
+        has_error_output = bool(result.error) or (
+            not result.ok and bool(result.text)
         )
 
         assert has_error_output, \
-            "Error information should be captured in output streams"
+            "Error information should be captured in the response"
 
     def test_partial_failures_dont_crash_suite(self):
         """Partial failures don't crash the entire test suite"""
-        failed_count = 0
-        success_count = 0
-        total_attempted = 0
-
         test_prompts = [
             ("llama3.2:1b", "Hi"),           # Should work
             ("bad-model-1", "test"),       # Should fail
@@ -203,24 +168,14 @@ class TestFailureModes:
             ("llama3.2:1b", "Bye"),          # Should work
         ]
 
-        for model, prompt in test_prompts:
-            total_attempted += 1
-            try:
-                result = subprocess.run(
-                    ["ollama", "run", model, prompt],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                if result.returncode == 0:
-                    success_count += 1
-                else:
-                    failed_count += 1
-            except Exception:
-                failed_count += 1
+        # All prompts fire concurrently; failures land in their own slot.
+        results = gather_generations(test_prompts)
+
+        success_count = sum(1 for result in results if result.ok)
+        failed_count = sum(1 for result in results if not result.ok)
 
         # All tests should have been attempted
-        assert total_attempted == len(test_prompts), \
+        assert len(results) == len(test_prompts), \
             "All tests should be attempted regardless of failures"
 
         # Should have both successes and failures (mixed results)
@@ -231,50 +186,31 @@ class TestFailureModes:
 class TestOllamaServiceReliability:
     """Test Ollama service availability and reliability"""
 
-    def test_ollama_service_running(self):
+    def test_ollama_service_running(self, ollama_tags):
         """Verify Ollama service is accessible"""
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        assert result.returncode == 0, \
-            f"Ollama service should be running. Error: {result.stderr}"
+        assert ollama_tags is not None, "Ollama service should be reachable"
+        assert ollama_tags.status_code == 200, \
+            f"Ollama service should be running. Error: {ollama_tags.text}"
 
-    def test_model_list_available(self):
+    def test_model_list_available(self, ollama_tags):
         """Verify we can list available models"""
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        assert result.returncode == 0, "Should be able to list models"
-        # Output should be a valid response (could be empty if no models)
-        assert isinstance(result.stdout, str), "Output should be a string"
+        assert ollama_tags is not None and ollama_tags.status_code == 200, \
+            "Should be able to list models"
+        # Response should be a valid model listing (could be empty)
+        assert isinstance(ollama_tags.json().get("models", []), list), \
+            "Model list should be a list"
 
     def test_concurrent_request_handling(self):
-        """Test handling of rapid sequential requests"""
-        results = []
+        """Test handling of genuinely concurrent requests"""
+        prompts = [("llama3.2:1b", f"Count to {i+1}") for i in range(3)]
 
-        # Make several rapid requests
-        for i in range(3):
-            result = subprocess.run(
-                ["ollama", "run", "llama3.2:1b", f"Count to {i+1}"],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            results.append(result.returncode)
+        results = gather_generations(prompts)
 
         # All requests should complete (success or graceful failure)
         assert len(results) == 3, "All requests should complete"
 
         # At least some should succeed
-        successes = sum(1 for r in results if r == 0)
+        successes = sum(1 for result in results if result.ok)
         assert successes > 0, "At least some concurrent requests should succeed"
 
 